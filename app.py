@@ -1,9 +1,15 @@
+import contextvars
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import preprocessor
 import helper
+import gallery
 
 # ================== PAGE CONFIG ==================
 st.set_page_config(
@@ -28,6 +34,24 @@ div[data-testid="metric-container"] {
 </style>
 """, unsafe_allow_html=True)
 
+# ================== DATA LOADING ==================
+@st.cache_resource(max_entries=2)
+def load_chat(data):
+    df = preprocessor.preprocess(data)
+    return df, preprocessor.build_day_index(df)
+
+
+def date_slice(frame, bounds):
+    """
+    Rows bounds[0]:bounds[1] of a full-chat frame. Under polars the slice
+    is bound to a zero-copy slice of the chat's one-time Polars copy.
+    """
+    if helper.current_backend() == 'polars':
+        import polars_backend
+        return polars_backend.slice_rows(frame, *bounds)
+    return frame.iloc[bounds[0]:bounds[1]]
+
+
 # ================== SIDEBAR ==================
 with st.sidebar:
     st.title("WhatsApp Analyzer")
@@ -46,9 +70,28 @@ with st.sidebar:
 
     if uploaded_file:
         data = uploaded_file.getvalue().decode("utf-8", errors="ignore")
-        df = preprocessor.preprocess(data)
+        chat_df, day_index = load_chat(data)
+
+        first_day = day_index[0][0].item()
+        last_day = day_index[0][-1].item()
+        date_range = st.date_input(
+            "📅 Date Range",
+            value=(first_day, last_day),
+            min_value=first_day,
+            max_value=last_day,
+            key="date_range"
+        )
+        # A half-picked range (start only) falls back to the full chat
+        if len(date_range) == 2:
+            start, end = date_range
+        else:
+            start, end = first_day, last_day
+
+        period = (start, end)
+        bounds = preprocessor.date_bounds(day_index, start, end)
 
-        user_list = df['user'].unique().tolist()
+        # Only users with messages in the range, so a user slice is never empty
+        user_list = chat_df['user'].iloc[bounds[0]:bounds[1]].unique().tolist()
         if 'group_notification' in user_list:
             user_list.remove('group_notification')
 
@@ -61,16 +104,191 @@ with st.sidebar:
             key="selected_user"
         )
 
+        approximate = st.checkbox(
+            "⚡ Approximate mode (large chats)",
+            help="Bounded-memory sketches for top words, emojis, messages, "
+                 "word cloud and response times. Counts may be overestimated "
+                 "by at most the shown error bound."
+        )
+
+        backend = st.selectbox(
+            "⚙️ Engine",
+            helper.available_backends(),
+            key="backend",
+            help="polars runs the aggregations multithreaded on Arrow "
+                 "columns; results match the pandas engine."
+        )
+        helper.set_backend(backend)
+
+        df = date_slice(chat_df, bounds)
+
         if st.button("Run Analysis"):
             st.session_state.run_analysis = True
 
+# ================== DISPLAY HELPERS ==================
+def error_caption(result):
+    """
+    Notes the worst-case overcount under tables built by approximate mode.
+    """
+    if 'error_bound' in result.attrs:
+        st.caption(
+            f"Counts may be overestimated by up to "
+            f"{result.attrs['error_bound']:.0f}"
+        )
+    if result.attrs.get('omitted'):
+        st.caption(
+            f"{result.attrs['omitted']} lower entries omitted: too close "
+            f"to call within the memory cap"
+        )
+
+
+# ================== BACKGROUND JOBS ==================
+LEADERBOARD_COLUMNS = [
+    'messages', 'words', 'media', 'links', 'emojis', 'first_active',
+    'last_active', 'positive', 'neutral', 'negative', 'avg_response_time'
+]
+MAX_FUTURES = 16  # per session, roughly the current and previous view
+
+
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def submit(key, fn, *args):
+    """
+    Submits fn(*args) once per key; reruns reuse the existing future.
+    The job runs in a copy of the caller's context, so it keeps this
+    session's engine. Least recently used futures beyond MAX_FUTURES
+    are cancelled and dropped.
+    """
+    futures = st.session_state.futures
+    st.session_state.touched.add(key)
+
+    if key in futures:
+        futures.move_to_end(key)
+        return futures[key]
+
+    futures[key] = get_executor().submit(
+        contextvars.copy_context().run, fn, *args
+    )
+    while len(futures) > MAX_FUTURES:
+        _, old = futures.popitem(last=False)
+        old.cancel()
+    return futures[key]
+
+
+def submit_after(key, deps, fn, *args):
+    """
+    Like submit, but runs fn(*dep_results, *args) only once every future
+    in deps has finished, so no pool worker sits blocked on its inputs.
+    Returns None while the inputs are still pending.
+    """
+    futures = st.session_state.futures
+    if key in futures:
+        st.session_state.touched.add(key)
+        futures.move_to_end(key)
+        return futures[key]
+    if not all(dep.done() for dep in deps):
+        return None
+    return submit(key, fn, *[dep.result() for dep in deps], *args)
+
+
+def failed(future):
+    return future.done() and (
+        future.cancelled() or future.exception() is not None
+    )
+
+
+def show_error(slots, reason):
+    for slot in slots:
+        slot.error(f"Could not compute this section: {reason}")
+
+
+def prune_futures(keep):
+    """
+    Cancels and drops queued jobs that this run did not ask for, i.e.
+    ones for a date range, user or mode that is no longer on screen.
+    """
+    live = st.session_state.touched | set(keep)
+    futures = st.session_state.futures
+    for key in [k for k in futures if k not in live]:
+        if futures[key].cancel():
+            del futures[key]
+
+
+def with_sentiment(df):
+    return helper.add_sentiment(df.copy(deep=False))
+
+
+def response_time_job(df, approximate):
+    if approximate:
+        return helper.response_time_sketch(df)
+
+    return (
+        helper.response_time_analysis(df),
+        helper.response_time_quantiles(df),
+        None
+    )
+
+
+def sentiment_mix_job(stats, sentiment_df, bounds):
+    mix = helper.user_sentiment_mix(date_slice(sentiment_df, bounds))
+    merged = stats.join(mix)
+    # Keep the column order of user_stats on a scored frame
+    return merged[[c for c in merged.columns if c != 'avg_response_time'] +
+                  ['avg_response_time']]
+
+
+def report_job(sentiment_df, rt_result, selected_user, bounds):
+    sentiment_df = date_slice(sentiment_df, bounds)
+    response_times = rt_result[0]
+
+    return helper.generate_pdf_report(
+        helper.generate_chat_summary(sentiment_df),
+        response_times,
+        helper.sentiment_stats(selected_user, sentiment_df)
+    )
+
+
 # ================== MAIN APP ==================
 if uploaded_file and st.session_state.run_analysis:
 
-    # ---------- BASIC STATS ----------
-    num_messages, words, num_media_messages, num_links = helper.fetch_stats(
-        selected_user, df
+    # ---------- BACKGROUND JOBS ----------
+    file_key = hashlib.md5(uploaded_file.getvalue()).hexdigest()
+    if st.session_state.get("futures_file") != file_key:
+        st.session_state.futures_file = file_key
+        st.session_state.futures = OrderedDict()
+    st.session_state.touched = set()
+
+    if df.empty:
+        st.warning("No messages in the selected date range.")
+        st.stop()
+
+    # Sentiment is scored once for the whole chat and sliced per range
+    sentiment_future = submit(("sentiment",), with_sentiment, chat_df)
+    rt_future = submit(
+        ("response_times", period, approximate, backend),
+        response_time_job, df, approximate
+    )
+    wc_future = submit(
+        ("wordcloud", period, selected_user, approximate),
+        helper.create_wordcloud, selected_user, df, approximate
     )
+    emoji_future = submit(
+        ("emoji", period, selected_user, approximate, backend),
+        helper.emoji_helper, selected_user, df, approximate
+    )
+
+    # Sections filled in as their future completes, as
+    # {future: (slots, render)}; errors are shown in the section's slots
+    renderers = {}
+
+    # Jobs started from the render loop once their inputs are ready, as
+    # (key, inputs, fn, args, slots, render); every input must be in renderers
+    deferred = []
+
+    status_slot = st.empty()
 
     # ================== TABS ==================
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -80,7 +298,6 @@ if uploaded_file and st.session_state.run_analysis:
         "Summary"
     ])
 
-    # ================== TAB 1: OVERVIEW ==================
     # ================== TAB 1: OVERVIEW ==================
     with tab1:
         st.subheader("Chat Overview")
@@ -141,42 +358,106 @@ if uploaded_file and st.session_state.run_analysis:
         # ===================== BUSY USERS =====================
         if selected_user == "Overall":
             with st.expander("Most Busy Users"):
-                x, new_df = helper.most_busy_users(df)
+                busy_slot = st.empty()
+                busy_slot.info("Computing user stats…")
+
+            with st.expander("User Leaderboard"):
+                sort_by = st.selectbox(
+                    "Rank by",
+                    LEADERBOARD_COLUMNS,
+                    key="leaderboard_sort"
+                )
+                board_slot = st.empty()
+                board_slot.info("Computing user stats…")
+
+            def render_board(stats):
+                board = stats.drop(index='group_notification', errors='ignore')
+
+                with board_slot.container():
+                    if sort_by not in board.columns:
+                        st.info("Sentiment columns appear once scoring finishes.")
+                        st.dataframe(board, use_container_width=True)
+                        return
+
+                    ascending = sort_by in ('first_active', 'avg_response_time')
+                    st.dataframe(
+                        board.sort_values(sort_by, ascending=ascending, kind='stable'),
+                        use_container_width=True
+                    )
 
-                col1, col2 = st.columns(2)
-                with col1:
-                    fig, ax = plt.subplots()
-                    ax.bar(x.index, x.values)
-                    plt.xticks(rotation=45)
-                    st.pyplot(fig)
+            def render_user_stats(stats):
+                x, new_df = helper.most_busy_users(df, stats)
 
-                with col2:
-                    st.dataframe(new_df, use_container_width=True)
+                with busy_slot.container():
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        fig, ax = plt.subplots()
+                        ax.bar(x.index, x.values)
+                        plt.xticks(rotation=45)
+                        st.pyplot(fig)
+
+                    with col2:
+                        st.dataframe(new_df, use_container_width=True)
+
+                render_board(stats)
+
+            # Counts render right away; sentiment mix is merged in once
+            # the whole-chat scoring finishes
+            stats_future = submit(
+                ("user_stats", period, backend), helper.user_stats, df
+            )
+            renderers[stats_future] = ([busy_slot, board_slot], render_user_stats)
+
+            deferred.append((
+                ("user_sentiment", period, backend),
+                [stats_future, sentiment_future],
+                sentiment_mix_job, (bounds,), [board_slot], render_board
+            ))
 
         # ===================== WORD ANALYSIS =====================
         with st.expander("Word Analysis"):
             st.markdown("**WordCloud**")
-            wc = helper.create_wordcloud(selected_user, df)
+            wc_slot = st.empty()
+            wc_slot.info("Generating word cloud…")
+
+            st.markdown("**Most Common Words**")
+            common_words = helper.most_common_words(selected_user, df, approximate)
+            if common_words.empty:
+                st.info("No words found.")
+            else:
+                fig, ax = plt.subplots()
+                ax.barh(common_words[0], common_words[1])
+                st.pyplot(fig)
+                error_caption(common_words)
+
+        def render_wordcloud(wc):
+            if wc is None:
+                wc_slot.info("No words found.")
+                return
+
             fig, ax = plt.subplots()
             ax.imshow(wc)
             ax.axis("off")
-            st.pyplot(fig)
+            wc_slot.pyplot(fig)
 
-            st.markdown("**Most Common Words**")
-            common_words = helper.most_common_words(selected_user, df)
-            fig, ax = plt.subplots()
-            ax.barh(common_words[0], common_words[1])
-            st.pyplot(fig)
+        renderers[wc_future] = ([wc_slot], render_wordcloud)
 
         # ===================== EMOJI ANALYSIS =====================
         with st.expander("Emoji Analysis"):
-            emoji_df = helper.emoji_helper(selected_user, df)
+            emoji_slot = st.empty()
+            emoji_slot.info("Counting emojis…")
+
+        def render_emoji(emoji_df):
+            if emoji_df.empty:
+                emoji_slot.info("No emojis found.")
+                return
 
-            if not emoji_df.empty:
+            with emoji_slot.container():
                 col1, col2 = st.columns(2)
 
                 with col1:
                     st.dataframe(emoji_df, use_container_width=True)
+                    error_caption(emoji_df)
 
                 with col2:
                     fig, ax = plt.subplots()
@@ -186,27 +467,49 @@ if uploaded_file and st.session_state.run_analysis:
                         autopct="%0.2f%%"
                     )
                     st.pyplot(fig)
-            else:
-                st.info("No emojis found.")
+
+        renderers[emoji_future] = ([emoji_slot], render_emoji)
+
+        # ===================== RESPONSE TIMES =====================
         with st.expander("Response Time Analysis"):
-            response_times = helper.response_time_analysis(df)
-
-            if response_times:
-                rt_df = (
-                    pd.DataFrame.from_dict(
-                        response_times,
-                        orient='index',
-                        columns=['Avg Response Time (min)']
-                    )
-                    .sort_values(by='Avg Response Time (min)')
-                    .reset_index()
-                    .rename(columns={'index': 'User'})
+            rt_slot = st.empty()
+            rt_slot.info("Computing response times…")
+
+        def render_response_times(result):
+            response_times, quantiles, rank_error = result
+
+            if not response_times:
+                rt_slot.info("Not enough data to compute response times.")
+                return
+
+            rt_df = (
+                pd.DataFrame.from_dict(
+                    response_times,
+                    orient='index',
+                    columns=['Avg Response Time (min)']
                 )
+                .sort_values(by='Avg Response Time (min)')
+                .reset_index()
+                .rename(columns={'index': 'User'})
+            )
 
+            rt_df['Median (min)'] = rt_df['User'].map(
+                lambda u: quantiles.get(u, {}).get(0.5)
+            )
+            rt_df['P90 (min)'] = rt_df['User'].map(
+                lambda u: quantiles.get(u, {}).get(0.9)
+            )
+
+            with rt_slot.container():
                 col1, col2 = st.columns([2, 3])
 
                 with col1:
                     st.dataframe(rt_df, use_container_width=True)
+                    if rank_error is not None:
+                        st.caption(
+                            f"Median and P90 are approximate: within "
+                            f"±{rank_error:.0%} of the reply ranks"
+                        )
 
                 with col2:
                     fig, ax = plt.subplots()
@@ -217,44 +520,15 @@ if uploaded_file and st.session_state.run_analysis:
                     ax.set_xlabel("Minutes")
                     ax.set_title("Average Response Time")
                     st.pyplot(fig)
-            else:
-                st.info("Not enough data to compute response times.")
+
+        renderers[rt_future] = ([rt_slot], render_response_times)
 
     # ================== TAB 2: SENTIMENT ==================
     with tab2:
         st.subheader("😊 Sentiment Insights")
 
-        if 'sentiment' not in df.columns:
-            df = helper.add_sentiment(df)
-
-        col_pos, col_neu, col_neg = st.columns(3)
-
-        with col_pos:
-            st.markdown("### Positive")
-            st.dataframe(
-                helper.most_common_messages_by_sentiment(
-                    selected_user, df, "Positive", 5
-                ),
-                use_container_width=True
-            )
-
-        with col_neu:
-            st.markdown("### Neutral")
-            st.dataframe(
-                helper.most_common_messages_by_sentiment(
-                    selected_user, df, "Neutral", 5
-                ),
-                use_container_width=True
-            )
-
-        with col_neg:
-            st.markdown("### Negative")
-            st.dataframe(
-                helper.most_common_messages_by_sentiment(
-                    selected_user, df, "Negative", 5
-                ),
-                use_container_width=True
-            )
+        sentiment_slot = st.empty()
+        sentiment_slot.info("Scoring message sentiment…")
 
     # ================== TAB 3: MEDIA ==================
     with tab3:
@@ -276,20 +550,40 @@ if uploaded_file and st.session_state.run_analysis:
         with col2:
             st.markdown("### 🖼 Image Gallery")
 
-            image_files = []
-            if media_files:
-                for f in media_files:
-                    if f.name.lower().endswith(
-                        ('.jpg', '.jpeg', '.png', '.webp')
-                    ):
-                        image_files.append(f)
+            image_files = gallery.image_files(media_files)
 
             if image_files:
+                pages = gallery.page_count(len(image_files))
+                page = st.number_input(
+                    f"Page (of {pages})",
+                    min_value=1,
+                    max_value=pages,
+                    value=1,
+                    key="gallery_page"
+                )
+                page_start = (page - 1) * gallery.PAGE_SIZE
+                page_files = gallery.get_page(image_files, page)
+                thumbs = gallery.thumbnails(page_files)
+
                 cols = 4
-                for i in range(0, len(image_files), cols):
+                for i in range(0, len(page_files), cols):
                     grid = st.columns(cols)
-                    for col, img in zip(grid, image_files[i:i + cols]):
-                        col.image(img, use_container_width=True)
+                    for j, col in enumerate(grid[:len(page_files[i:i + cols])]):
+                        idx = i + j
+                        if thumbs[idx] is None:
+                            col.warning(f"Could not read {page_files[idx].name}")
+                            continue
+                        col.image(thumbs[idx], use_container_width=True)
+                        if col.button("Full size", key=f"gallery_full_{page_start + idx}"):
+                            st.session_state.gallery_full = page_start + idx
+
+                full = st.session_state.get("gallery_full")
+                if full is not None and full < len(image_files):
+                    st.markdown(f"**{image_files[full].name}**")
+                    st.image(image_files[full], use_container_width=True)
+                    if st.button("Close", key="gallery_close"):
+                        st.session_state.gallery_full = None
+                        st.rerun()
             else:
                 st.info("No images uploaded.")
 
@@ -297,44 +591,91 @@ if uploaded_file and st.session_state.run_analysis:
     with tab4:
         st.subheader("Chat Summary")
 
-        if 'sentiment' not in df.columns:
-            df = helper.add_sentiment(df)
+        summary_slot = st.empty()
+        summary_slot.info("Waiting for sentiment analysis…")
 
-        summary = helper.generate_chat_summary(df)
+        st.divider()
+        st.subheader("Download Report")
 
-        st.info(helper.generate_natural_language_summary(summary))
+        report_slot = st.empty()
+        report_slot.info("Building PDF report…")
 
-        st.markdown("### Key Insights")
-        for point in helper.generate_bullet_summary(summary):
-            st.markdown(f"- {point}")
+    def render_sentiment(sentiment_df):
+        sentiment_df = date_slice(sentiment_df, bounds)
 
-        st.divider()
-        st.subheader("Download Report")
+        with sentiment_slot.container():
+            for col, sentiment in zip(
+                st.columns(3), ["Positive", "Neutral", "Negative"]
+            ):
+                with col:
+                    st.markdown(f"### {sentiment}")
+                    top = helper.most_common_messages_by_sentiment(
+                        selected_user, sentiment_df, sentiment, 5, approximate
+                    )
+                    st.dataframe(top, use_container_width=True)
+                    error_caption(top)
 
-        # Ensure data exists
-        if 'sentiment' not in df.columns:
-            df = helper.add_sentiment(df)
+        summary = helper.generate_chat_summary(sentiment_df)
 
-        summary = helper.generate_chat_summary(df)
-        sentiment_counts = helper.sentiment_stats(selected_user, df)
-        response_times = helper.response_time_analysis(df)
+        with summary_slot.container():
+            st.info(helper.generate_natural_language_summary(summary))
 
-        pdf_bytes = helper.generate_pdf_report(
-            summary,
-            response_times,
-            sentiment_counts
-        )
+            st.markdown("### Key Insights")
+            for point in helper.generate_bullet_summary(summary):
+                st.markdown(f"- {point}")
 
-        st.download_button(
+    renderers[sentiment_future] = (
+        [sentiment_slot, summary_slot], render_sentiment
+    )
+
+    def render_report(pdf_bytes):
+        report_slot.download_button(
             label="⬇️ Download PDF Report",
             data=pdf_bytes,
             file_name="whatsapp_chat_analysis.pdf",
             mime="application/pdf"
         )
 
+    deferred.append((
+        ("report", period, selected_user, approximate, backend),
+        [sentiment_future, rt_future],
+        report_job, (selected_user, bounds), [report_slot], render_report
+    ))
+
+    prune_futures(key for key, *_ in deferred)
+
+    # ---------- PROGRESSIVE RENDERING ----------
+    pending = set(renderers)
+    while pending or deferred:
+        for job in list(deferred):
+            key, deps, fn, args, slots, render = job
+            if any(failed(dep) for dep in deps):
+                show_error(slots, "an earlier step it depends on failed")
+                deferred.remove(job)
+                continue
+
+            future = submit_after(key, deps, fn, *args)
+            if future is not None:
+                renderers[future] = (slots, render)
+                pending.add(future)
+                deferred.remove(job)
+
+        # Short waits with a Streamlit call in between, so a widget change
+        # can interrupt this run instead of queueing behind slow jobs
+        status_slot.caption(
+            f"⏳ {len(pending) + len(deferred)} section(s) still computing…"
+        )
+        done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
 
-else:
-    st.info("👈 Upload a WhatsApp chat file and click **Run Analysis**")
+        for future in done:
+            slots, render = renderers[future]
+            try:
+                render(future.result())
+            except Exception as exc:
+                show_error(slots, exc)
 
+    status_slot.empty()
 
 
+else:
+    st.info("👈 Upload a WhatsApp chat file and click **Run Analysis**")
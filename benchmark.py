@@ -0,0 +1,199 @@
+"""
+Benchmarks the analytics helpers on the pandas and polars backends and
+checks that both return the same results, then checks that approximate
+mode reproduces the exact top-20 words, emojis and messages.
+
+create_wordcloud has no polars port: nearly all of its time is spent
+laying out and rendering the image inside WordCloud, so it runs on
+pandas under both backends and is listed for reference only.
+
+    python benchmark.py chat.txt [--repeat 3] [--sentiment]
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+import helper
+import preprocessor
+
+TOP_N = 20
+
+
+def _cases(df, user):
+    return {
+        'fetch_stats': lambda: helper.fetch_stats('Overall', df),
+        'fetch_stats (user)': lambda: helper.fetch_stats(user, df),
+        'most_busy_users': lambda: helper.most_busy_users(df),
+        'most_common_words': lambda: helper.most_common_words('Overall', df),
+        'emoji_helper': lambda: helper.emoji_helper('Overall', df),
+        'monthly_timeline': lambda: helper.monthly_timeline('Overall', df),
+        'daily_timeline': lambda: helper.daily_timeline('Overall', df),
+        'week_activity_map': lambda: helper.week_activity_map('Overall', df),
+        'month_activity_map': lambda: helper.month_activity_map('Overall', df),
+        'media_stats': lambda: helper.media_stats('Overall', df),
+        'most_media_shared_users': lambda: helper.most_media_shared_users(df),
+        'sentiment_stats': lambda: helper.sentiment_stats('Overall', df),
+        'most_common_messages_by_sentiment': lambda: (
+            helper.most_common_messages_by_sentiment('Overall', df, 'Positive')
+        ),
+        'response_time_analysis': lambda: helper.response_time_analysis(df),
+        'response_time_quantiles': lambda: helper.response_time_quantiles(df),
+        'user_stats': lambda: helper.user_stats(df),
+        'activity_heatmap': lambda: helper.activity_heatmap('Overall', df),
+        'activity_heatmap (user)': lambda: helper.activity_heatmap(user, df),
+        'create_wordcloud (pandas only)': lambda: (
+            helper.create_wordcloud('Overall', df).words_
+        ),
+    }
+
+
+def _same(a, b):
+    if isinstance(a, tuple):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+
+    if isinstance(a, float):
+        return abs(a - b) <= 0.01
+
+    try:
+        if isinstance(a, pd.DataFrame):
+            pd.testing.assert_frame_equal(
+                a, b, check_dtype=False, check_column_type=False
+            )
+        elif isinstance(a, pd.Series):
+            pd.testing.assert_series_equal(
+                a, b, check_dtype=False, check_index_type=False
+            )
+        else:
+            return a == b
+    except AssertionError:
+        return False
+    return True
+
+
+def _approximate_cases(df):
+    cases = {
+        'words': lambda approximate: helper.most_common_words(
+            'Overall', df, approximate
+        ),
+        'emojis': lambda approximate: helper.emoji_helper(
+            'Overall', df, approximate
+        ).head(TOP_N),
+    }
+    if 'sentiment' in df.columns:
+        for sentiment in ['Positive', 'Neutral', 'Negative']:
+            cases[f'messages ({sentiment})'] = (
+                lambda approximate, sentiment=sentiment:
+                helper.most_common_messages_by_sentiment(
+                    'Overall', df, sentiment, TOP_N, approximate
+                )
+            )
+    return cases
+
+
+def _top_matches(exact, approx):
+    """
+    True when the approximate top list (which leaves out entries it cannot
+    guarantee) agrees with the exact one:
+    - every approximate entry is in the exact top list, or could tie its
+      cutoff within the error bound;
+    - every exact entry clearly above the cutoff (by more than twice the
+      bound) is present;
+    - each shared count is overestimated by no more than the bound.
+    """
+    if exact.empty:
+        return approx.empty
+
+    exact_counts = dict(zip(exact.iloc[:, 0], exact.iloc[:, 1]))
+    approx_counts = dict(zip(approx.iloc[:, 0], approx.iloc[:, 1]))
+    bound = approx.attrs['error_bound']
+    cutoff = exact.iloc[-1, 1] if len(exact) == TOP_N else 0
+
+    for item, count in approx_counts.items():
+        if item not in exact_counts and count - bound > cutoff:
+            return False
+
+    clear = {
+        item for item, count in exact_counts.items()
+        if count > cutoff + 2 * bound
+    }
+    if not clear <= approx_counts.keys():
+        return False
+
+    return all(
+        0 <= approx_counts[item] - exact_counts[item] <= bound
+        for item in approx_counts.keys() & exact_counts.keys()
+    )
+
+
+def _time(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('chat', help="exported WhatsApp chat (.txt)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sentiment', action='store_true',
+                        help="score sentiment first (slow on large chats)")
+    args = parser.parse_args()
+
+    with open(args.chat, encoding='utf-8', errors='ignore') as f:
+        df = preprocessor.preprocess(f.read())
+    if args.sentiment:
+        df = helper.add_sentiment(df)
+
+    user = df['user'].value_counts().index[0]
+    print(f"{len(df)} messages, {df['user'].nunique()} users")
+
+    # The app converts each chat once and then slices it, so the
+    # conversion is reported separately from the per-helper timings
+    import polars_backend
+    convert_time, _ = _time(lambda: polars_backend.to_polars(df), 1)
+    print(f"one-time Polars conversion: {convert_time * 1000:.1f} ms\n")
+    print(f"{'helper':<36}{'pandas ms':>11}{'polars ms':>11}{'speedup':>9}  match")
+
+    mismatches = 0
+    for name, fn in _cases(df, user).items():
+        helper.set_backend('pandas')
+        pd_time, expected = _time(fn, args.repeat)
+
+        helper.set_backend('polars')
+        pl_time, actual = _time(fn, args.repeat)
+
+        match = _same(expected, actual)
+        mismatches += not match
+        print(
+            f"{name:<36}{pd_time * 1000:>11.1f}{pl_time * 1000:>11.1f}"
+            f"{pd_time / pl_time:>8.1f}x  {'ok' if match else 'MISMATCH'}"
+        )
+
+    helper.set_backend('pandas')
+
+    print(f"\n{'approximate top-' + str(TOP_N):<36}{'exact ms':>11}{'approx ms':>11}{'bound':>9}{'shown':>7}  match")
+    for name, fn in _approximate_cases(df).items():
+        exact_time, exact = _time(lambda: fn(False), 1)
+        approx_time, approx = _time(lambda: fn(True), 1)
+
+        match = _top_matches(exact, approx)
+        mismatches += not match
+        print(
+            f"{name:<36}{exact_time * 1000:>11.1f}{approx_time * 1000:>11.1f}"
+            f"{approx.attrs['error_bound']:>9.1f}{len(approx):>7}"
+            f"  {'ok' if match else 'MISMATCH'}"
+        )
+
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+# =====================================================
+# SETTINGS
+# =====================================================
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+THUMB_SIZE = (320, 320)
+PAGE_SIZE = 12                      # 3 rows of 4
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # thumbnail cache budget
+
+_pool = ThreadPoolExecutor(max_workers=4)
+
+# =====================================================
+# THUMBNAIL CACHE
+# =====================================================
+
+
+class ThumbnailCache:
+    """
+    Thread-safe LRU of encoded thumbnails keyed by content hash,
+    evicting the oldest entries once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = value
+            self.size += len(value)
+
+            while self.size > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.size -= len(old)
+
+
+cache = ThumbnailCache()
+
+# =====================================================
+# THUMBNAILS
+# =====================================================
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def make_thumbnail(data, size=THUMB_SIZE):
+    """
+    Decodes image bytes and returns a downsized JPEG as bytes.
+    """
+    img = Image.open(io.BytesIO(data))
+    img.draft('RGB', size)  # JPEG: decode at reduced scale
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail(size)
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=80)
+    return out.getvalue()
+
+
+def _cached_thumbnail(data):
+    key = content_hash(data)
+
+    thumb = cache.get(key)
+    if thumb is None:
+        try:
+            thumb = make_thumbnail(data)
+        except Exception:
+            return None
+        cache.put(key, thumb)
+
+    return thumb
+
+
+def thumbnails(files):
+    """
+    Thumbnails for a list of uploaded files, built in parallel.
+    Unreadable images come back as None.
+    """
+    return list(_pool.map(lambda f: _cached_thumbnail(f.getvalue()), files))
+
+
+def image_files(files):
+    if not files:
+        return []
+    return [f for f in files if f.name.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def page_count(n, page_size=PAGE_SIZE):
+    return max(1, -(-n // page_size))
+
+
+def get_page(items, page, page_size=PAGE_SIZE):
+    start = (page - 1) * page_size
+    return items[start:start + page_size]
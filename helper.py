@@ -1,3 +1,9 @@
+import contextvars
+import functools
+import importlib.util
+import inspect
+
+import numpy as np
 import pandas as pd
 from collections import Counter
 import emoji
@@ -6,6 +12,8 @@ from urlextract import URLExtract
 from wordcloud import WordCloud
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
+from sketches import SpaceSaving, ReservoirSample, QuantileSketch
+
 # =====================================================
 # BASIC UTILITIES
 # =====================================================
@@ -13,10 +21,73 @@ from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 extract = URLExtract()
 analyzer = SentimentIntensityAnalyzer()
 
+# Memory caps used by approximate mode
+APPROX_MAX_ITEMS = 2000        # counters per heavy-hitter sketch
+APPROX_SAMPLE_SIZE = 20000     # messages sampled for the word cloud
+APPROX_QUANTILE_K = 200        # quantile sketch accuracy parameter
+
+# =====================================================
+# BACKENDS
+# =====================================================
+
+BACKENDS = ('pandas', 'polars')
+
+# Per context, so each Streamlit session (a thread) keeps its own engine;
+# background jobs see the engine of the context they were submitted from
+_backend = contextvars.ContextVar('backend', default='pandas')
+
+
+def available_backends():
+    return [
+        name for name in BACKENDS
+        if name == 'pandas' or (
+            importlib.util.find_spec('polars') and
+            importlib.util.find_spec('pyarrow')
+        )
+    ]
+
+
+def current_backend():
+    return _backend.get()
+
+
+def set_backend(name):
+    """
+    Switches the dispatched helpers between 'pandas' (default) and the
+    optional multithreaded 'polars' backend (requires polars + pyarrow)
+    for the current context only.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+
+    if name == 'polars':
+        import polars_backend  # noqa: F401  (fail early if not installed)
+
+    _backend.set(name)
+
+
+def backend_dispatch(fn):
+    """
+    Routes calls to the same-named function of the active backend.
+    Approximate-mode calls always use the pandas sketches.
+    """
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _backend.get() == 'polars':
+            if not sig.bind(*args, **kwargs).arguments.get('approximate'):
+                import polars_backend
+                return getattr(polars_backend, fn.__name__)(*args, **kwargs)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
 # =====================================================
 # BASIC STATS
 # =====================================================
 
+@backend_dispatch
 def fetch_stats(selected_user, df):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
@@ -25,14 +96,27 @@ def fetch_stats(selected_user, df):
     words = sum(len(msg.split()) for msg in df['message'])
     num_media_messages = df[df['message'] == '<Media omitted>'].shape[0]
 
+    # URLs always contain a dot, so only those messages need the extractor
     links = []
-    for msg in df['message']:
+    for msg in df.loc[df['message'].str.contains('.', regex=False), 'message']:
         links.extend(extract.find_urls(msg))
 
     return num_messages, words, num_media_messages, len(links)
 
 
-def most_busy_users(df):
+@backend_dispatch
+def most_busy_users(df, stats=None):
+    """
+    Top-5 message counts and percent share per user. When a `user_stats`
+    table is passed in, both are derived from it instead of rescanning df.
+    """
+    if stats is not None:
+        counts = stats['messages'].sort_values(ascending=False, kind='stable')
+        count = counts.head()
+        percent = (counts / counts.sum() * 100).round(2).reset_index()
+        percent.columns = ['name', 'percent']
+        return count, percent
+
     count = df['user'].value_counts().head()
     percent = (
         df['user'].value_counts(normalize=True) * 100
@@ -40,11 +124,92 @@ def most_busy_users(df):
     percent.columns = ['name', 'percent']
     return count, percent
 
+
+@backend_dispatch
+def user_stats(df):
+    """
+    Per-user stats table built in a single grouped pass: message, word,
+    media, link and emoji counts, sentiment mix (when computed),
+    first/last active date and mean response time.
+    """
+    msgs = df['message']
+
+    # URLs always contain a dot, so only those messages need the extractor
+    links = pd.Series(0, index=df.index)
+    has_dot = msgs.str.contains('.', regex=False)
+    links[has_dot] = msgs[has_dot].map(lambda m: len(extract.find_urls(m)))
+
+    temp = pd.DataFrame({
+        'user': df['user'],
+        'messages': 1,
+        'words': msgs.str.split().str.len(),
+        'media': msgs == '<Media omitted>',
+        'links': links,
+        'emojis': msgs.map(lambda m: sum(c in emoji.EMOJI_DATA for c in m)),
+        'first_active': df['only_date'],
+        'last_active': df['only_date'],
+    })
+
+    agg = {
+        'messages': 'sum',
+        'words': 'sum',
+        'media': 'sum',
+        'links': 'sum',
+        'emojis': 'sum',
+        'first_active': 'min',
+        'last_active': 'max',
+    }
+
+    if 'sentiment' in df.columns:
+        for label in ['Positive', 'Neutral', 'Negative']:
+            temp[label.lower()] = df['sentiment'] == label
+            agg[label.lower()] = 'sum'
+
+    # Users in first-seen order, so ties rank like value_counts
+    stats = temp.groupby('user', sort=False).agg(agg)
+    stats['avg_response_time'] = stats.index.map(response_time_analysis(df))
+
+    return stats.sort_values('messages', ascending=False, kind='stable')
+
+
+def user_sentiment_mix(df):
+    """
+    Positive / neutral / negative message counts per user.
+    """
+    return (
+        pd.crosstab(df['user'], df['sentiment'])
+        .reindex(columns=['Positive', 'Neutral', 'Negative'], fill_value=0)
+        .rename(columns=str.lower)
+        .rename_axis(columns=None)
+    )
+
+# =====================================================
+# APPROXIMATE MODE
+# =====================================================
+
+def _sketch_frame(items, top_n=None, columns=None):
+    """
+    Counts `items` with a Space-Saving sketch and returns the top entries
+    in the same shape as Counter.most_common. Entries whose rank the
+    sketch cannot guarantee are left out; their number is stored in
+    `attrs['omitted']` and the worst-case overcount in `attrs['error_bound']`.
+    """
+    sketch = SpaceSaving(APPROX_MAX_ITEMS)
+    sketch.extend(items)
+
+    n = len(sketch.counts) if top_n is None else top_n
+    top = sketch.guaranteed_top(n)
+
+    result = pd.DataFrame(top, columns=columns)
+    result.attrs['error_bound'] = sketch.error_bound
+    result.attrs['omitted'] = min(n, len(sketch.counts)) - len(top)
+    return result
+
 # =====================================================
 # WORD ANALYSIS
 # =====================================================
 
-def create_wordcloud(selected_user, df):
+def create_wordcloud(selected_user, df, approximate=False):
     with open('stop_hinglish.txt', encoding='utf-8') as f:
         stop_words = set(f.read().split())
 
@@ -59,13 +224,23 @@ def create_wordcloud(selected_user, df):
     def clean(msg):
         return " ".join(w for w in msg.lower().split() if w not in stop_words)
 
-    text = temp['message'].apply(clean).str.cat(sep=" ")
+    if approximate:
+        sample = ReservoirSample(APPROX_SAMPLE_SIZE)
+        sample.extend(temp['message'])
+        text = " ".join(clean(msg) for msg in sample.items)
+    else:
+        text = temp['message'].apply(clean).str.cat(sep=" ")
+
+    # WordCloud raises on empty text (e.g. a user who only sent media)
+    if not text.strip():
+        return None
 
     wc = WordCloud(width=500, height=500, background_color='white')
     return wc.generate(text)
 
 
-def most_common_words(selected_user, df):
+@backend_dispatch
+def most_common_words(selected_user, df, approximate=False):
     with open('stop_hinglish.txt', encoding='utf-8') as f:
         stop_words = set(f.read().split())
 
@@ -74,11 +249,15 @@ def most_common_words(selected_user, df):
 
     temp = df[df['message'] != '<Media omitted>']
 
-    words = []
-    for msg in temp['message']:
-        for word in msg.lower().split():
-            if word not in stop_words:
-                words.append(word)
+    words = (
+        word
+        for msg in temp['message']
+        for word in msg.lower().split()
+        if word not in stop_words
+    )
+
+    if approximate:
+        return _sketch_frame(words, 20)
 
     return pd.DataFrame(Counter(words).most_common(20))
 
@@ -86,13 +265,15 @@ def most_common_words(selected_user, df):
 # EMOJI
 # =====================================================
 
-def emoji_helper(selected_user, df):
+@backend_dispatch
+def emoji_helper(selected_user, df, approximate=False):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
 
-    emojis = []
-    for msg in df['message']:
-        emojis.extend([c for c in msg if c in emoji.EMOJI_DATA])
+    emojis = (c for msg in df['message'] for c in msg if c in emoji.EMOJI_DATA)
+
+    if approximate:
+        return _sketch_frame(emojis)
 
     return pd.DataFrame(Counter(emojis).most_common())
 
@@ -100,6 +281,7 @@ def emoji_helper(selected_user, df):
 # TIMELINES
 # =====================================================
 
+@backend_dispatch
 def monthly_timeline(selected_user, df):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
@@ -113,6 +295,7 @@ def monthly_timeline(selected_user, df):
     return timeline
 
 
+@backend_dispatch
 def daily_timeline(selected_user, df):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
@@ -120,6 +303,7 @@ def daily_timeline(selected_user, df):
     return df.groupby('only_date').count()['message'].reset_index()
 
 
+@backend_dispatch
 def week_activity_map(selected_user, df):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
@@ -127,6 +311,7 @@ def week_activity_map(selected_user, df):
     return df['day_name'].value_counts()
 
 
+@backend_dispatch
 def month_activity_map(selected_user, df):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
@@ -134,6 +319,7 @@ def month_activity_map(selected_user, df):
     return df['month'].value_counts()
 
 
+@backend_dispatch
 def activity_heatmap(selected_user, df):
     if selected_user != 'Overall':
         df = df[df['user'] == selected_user]
@@ -164,7 +350,9 @@ def add_sentiment(df):
     return df
 
 
-def most_common_messages_by_sentiment(selected_user, df, sentiment, top_n=10):
+@backend_dispatch
+def most_common_messages_by_sentiment(selected_user, df, sentiment, top_n=10,
+                                      approximate=False):
     if 'sentiment' not in df.columns:
         return pd.DataFrame()
 
@@ -173,6 +361,9 @@ def most_common_messages_by_sentiment(selected_user, df, sentiment, top_n=10):
 
     temp = df[(df['sentiment'] == sentiment) & (df['message'] != '<Media omitted>')]
 
+    if approximate:
+        return _sketch_frame(temp['message'], top_n, columns=['message', 'count'])
+
     return pd.DataFrame(
         Counter(temp['message']).most_common(top_n),
         columns=['message', 'count']
@@ -182,6 +373,7 @@ def most_common_messages_by_sentiment(selected_user, df, sentiment, top_n=10):
 # MEDIA
 # =====================================================
 
+@backend_dispatch
 def media_stats(selected_user, df):
     if selected_user != "Overall":
         df = df[df['user'] == selected_user]
@@ -189,6 +381,7 @@ def media_stats(selected_user, df):
     return df['media_type'].value_counts()
 
 
+@backend_dispatch
 def most_media_shared_users(df):
     media_df = df[df['media_type'] != 'Text']
     if media_df.empty:
@@ -238,20 +431,21 @@ def generate_bullet_summary(summary):
 
 
 
-def response_time_analysis(df):
+def _response_gaps(df):
     """
-    Calculates average response time (in minutes) per user
-    based on consecutive messages from different users.
+    Yields (user, minutes) for every reply, i.e. consecutive messages
+    from different users, skipping system messages and gaps over a day.
     """
 
     # Sort by time
-    df = df.sort_values('datetime').reset_index(drop=True)
+    df = df.sort_values('datetime', kind='stable').reset_index(drop=True)
 
-    response_times = {}
+    users = df['user'].tolist()
+    times = df['datetime'].tolist()
 
     for i in range(1, len(df)):
-        prev_user = df.loc[i - 1, 'user']
-        curr_user = df.loc[i, 'user']
+        prev_user = users[i - 1]
+        curr_user = users[i]
 
         # Ignore same user replies & system messages
         if (
@@ -261,15 +455,26 @@ def response_time_analysis(df):
         ):
             continue
 
-        time_diff = (
-            df.loc[i, 'datetime'] - df.loc[i - 1, 'datetime']
-        ).total_seconds() / 60  # minutes
+        time_diff = (times[i] - times[i - 1]).total_seconds() / 60  # minutes
 
         # Ignore extremely large gaps (e.g., days)
         if time_diff <= 0 or time_diff > 1440:
             continue
 
-        response_times.setdefault(curr_user, []).append(time_diff)
+        yield curr_user, time_diff
+
+
+@backend_dispatch
+def response_time_analysis(df):
+    """
+    Calculates average response time (in minutes) per user
+    based on consecutive messages from different users.
+    """
+
+    response_times = {}
+
+    for user, time_diff in _response_gaps(df):
+        response_times.setdefault(user, []).append(time_diff)
 
     # Average response time per user
     avg_response_time = {
@@ -281,6 +486,64 @@ def response_time_analysis(df):
     return avg_response_time
 
 
+@backend_dispatch
+def response_time_quantiles(df, quantiles=(0.5, 0.9), approximate=False):
+    """
+    Returns {user: {quantile: minutes}} of response times.
+    In approximate mode each user keeps a bounded quantile sketch
+    instead of every sample.
+    """
+
+    if approximate:
+        return response_time_sketch(df, quantiles)[1]
+
+    response_times = {}
+    for user, time_diff in _response_gaps(df):
+        response_times.setdefault(user, []).append(time_diff)
+
+    return {
+        user: {
+            q: round(float(np.quantile(times, q, method='inverted_cdf')), 2)
+            for q in quantiles
+        }
+        for user, times in response_times.items()
+        if len(times) >= 3
+    }
+
+
+def response_time_sketch(df, quantiles=(0.5, 0.9)):
+    """
+    Bounded-memory response times in a single pass: a running sum per
+    user for the mean and a quantile sketch for the percentiles.
+    Returns (averages, quantiles, rank_error), the first two shaped like
+    response_time_analysis and response_time_quantiles.
+    """
+
+    totals = {}
+    sketches = {}
+    for user, time_diff in _response_gaps(df):
+        totals[user] = totals.get(user, 0) + time_diff
+        sketches.setdefault(
+            user, QuantileSketch(APPROX_QUANTILE_K)
+        ).update(time_diff)
+
+    reliable = {
+        user: sketch for user, sketch in sketches.items()
+        if sketch.n >= 3  # minimum samples for reliability
+    }
+
+    averages = {
+        user: round(totals[user] / sketch.n, 2)
+        for user, sketch in reliable.items()
+    }
+    percentiles = {
+        user: {q: round(sketch.quantile(q), 2) for q in quantiles}
+        for user, sketch in reliable.items()
+    }
+
+    return averages, percentiles, QuantileSketch(APPROX_QUANTILE_K).rank_error
+
+
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.pagesizes import A4
@@ -342,6 +605,7 @@ def generate_pdf_report(summary, response_times, sentiment_counts):
     buffer.seek(0)
 
     return buffer.getvalue()
+@backend_dispatch
 def sentiment_stats(selected_user, df):
     """
     Returns count of Positive / Neutral / Negative messages
@@ -0,0 +1,378 @@
+import weakref
+from collections import Counter
+
+import emoji
+import pandas as pd
+import polars as pl
+
+from helper import extract
+
+# =====================================================
+# POLARS BACKEND
+# =====================================================
+# Multithreaded implementations of the helper aggregations. Every
+# function keeps the signature of its helper counterpart, takes the same
+# pandas frame and returns the same pandas objects; helper.set_backend
+# routes calls here.
+
+_COLUMNS = [
+    'user', 'message', 'datetime', 'only_date', 'year', 'month_num',
+    'month', 'day_name', 'period', 'media_type', 'sentiment'
+]
+
+# Single-codepoint emojis as a regex class (`c in EMOJI_DATA` per char)
+_EMOJI_CLASS = "[" + "".join(
+    f"\\x{{{ord(e):X}}}" for e in emoji.EMOJI_DATA if len(e) == 1
+) + "]"
+
+# id(pandas frame) -> (its columns, its Polars view); an entry is dropped
+# when its pandas frame is garbage collected, so no frame is kept alive
+# here. The columns let a view be rebuilt after a column is added in
+# place (e.g. by helper.add_sentiment)
+_views = {}
+
+
+def from_pandas(df):
+    """
+    Arrow-backed Polars copy of the columns the helpers use.
+    """
+    return pl.from_pandas(df[[c for c in _COLUMNS if c in df.columns]])
+
+
+def bind(df, pl_df):
+    """
+    Registers pl_df as the Polars view of the pandas frame df.
+    """
+    key = id(df)
+    if key not in _views:
+        weakref.finalize(df, _views.pop, key, None)
+    _views[key] = (tuple(df.columns), pl_df)
+
+
+def to_polars(df):
+    """
+    Polars view of df, converted on first use and reused until df's
+    columns change.
+    """
+    columns, pl_df = _views.get(id(df), (None, None))
+    if columns != tuple(df.columns):
+        pl_df = from_pandas(df)
+        bind(df, pl_df)
+    return pl_df
+
+
+def slice_rows(df, lo, hi):
+    """
+    df.iloc[lo:hi], bound to a zero-copy slice of df's Polars view, so
+    the full frame is converted once however many slices are taken.
+    """
+    view = df.iloc[lo:hi]
+    bind(view, to_polars(df).slice(lo, hi - lo))
+    return view
+
+
+def _frame(selected_user, df):
+    lf = to_polars(df).lazy()
+    if selected_user != 'Overall':
+        lf = lf.filter(pl.col('user') == selected_user)
+    return lf
+
+
+def _value_counts(lf, col):
+    """
+    pandas-style value_counts: descending, ties in first-seen order.
+    """
+    counts = (
+        lf.group_by(col, maintain_order=True)
+        .len()
+        .sort('len', descending=True, maintain_order=True)
+        .collect()
+    )
+    return pd.Series(
+        counts['len'].to_list(),
+        index=pd.Index(counts[col].to_list(), name=col),
+        name='count'
+    )
+
+
+def _most_common(lf, col, n=None):
+    """
+    Counter.most_common over the values of `col`.
+    """
+    counts = (
+        lf.group_by(col, maintain_order=True)
+        .len()
+        .sort('len', descending=True, maintain_order=True)
+    )
+    if n is not None:
+        counts = counts.head(n)
+    return counts.collect().rows()
+
+
+def _stop_words():
+    with open('stop_hinglish.txt', encoding='utf-8') as f:
+        return list(set(f.read().split()))
+
+# =====================================================
+# BASIC STATS
+# =====================================================
+
+def fetch_stats(selected_user, df):
+    lf = _frame(selected_user, df)
+    msg = pl.col('message')
+
+    stats = lf.select(
+        pl.len().alias('messages'),
+        msg.str.count_matches(r'\S+').sum().alias('words'),
+        (msg == '<Media omitted>').sum().alias('media'),
+    ).collect().row(0)
+
+    # URLs always contain a dot, so only those messages need the extractor
+    candidates = (
+        lf.filter(msg.str.contains('.', literal=True))
+        .select('message').collect()['message']
+    )
+    links = sum(len(extract.find_urls(m)) for m in candidates)
+
+    return stats[0], stats[1], stats[2], links
+
+
+def most_busy_users(df, stats=None):
+    if stats is not None:
+        counts = stats['messages'].sort_values(ascending=False, kind='stable')
+    else:
+        counts = _value_counts(to_polars(df).lazy(), 'user')
+
+    count = counts.head()
+    percent = (counts / counts.sum() * 100).round(2).reset_index()
+    percent.columns = ['name', 'percent']
+    return count, percent
+
+
+def user_stats(df):
+    pl_df = to_polars(df)
+    msg = pl.col('message')
+
+    aggs = [
+        pl.len().alias('messages'),
+        msg.str.count_matches(r'\S+').sum().alias('words'),
+        (msg == '<Media omitted>').sum().alias('media'),
+        msg.str.count_matches(_EMOJI_CLASS).sum().alias('emojis'),
+        pl.col('only_date').min().alias('first_active'),
+        pl.col('only_date').max().alias('last_active'),
+    ]
+    if 'sentiment' in pl_df.columns:
+        for label in ['Positive', 'Neutral', 'Negative']:
+            aggs.append((pl.col('sentiment') == label).sum().alias(label.lower()))
+
+    # Users in first-seen order, so ties rank like value_counts
+    grouped = pl_df.lazy().group_by('user', maintain_order=True).agg(aggs).collect()
+    stats = pd.DataFrame(
+        {name: grouped[name].to_list() for name in grouped.columns}
+    ).set_index('user')
+
+    # URLs always contain a dot, so only those messages need the extractor
+    links = Counter()
+    candidates = pl_df.filter(msg.str.contains('.', literal=True))
+    for user, message in candidates.select('user', 'message').iter_rows():
+        links[user] += len(extract.find_urls(message))
+    stats.insert(3, 'links', [links[user] for user in stats.index])
+
+    stats['avg_response_time'] = stats.index.map(response_time_analysis(df))
+
+    return stats.sort_values('messages', ascending=False, kind='stable')
+
+# =====================================================
+# WORD ANALYSIS
+# =====================================================
+
+def most_common_words(selected_user, df, approximate=False):
+    lf = (
+        _frame(selected_user, df)
+        .filter(pl.col('message') != '<Media omitted>')
+        .select(
+            pl.col('message').str.to_lowercase()
+            .str.extract_all(r'\S+').alias('word')
+        )
+        .explode('word')
+        .filter(
+            pl.col('word').is_not_null() &
+            ~pl.col('word').is_in(_stop_words())
+        )
+    )
+    return pd.DataFrame(_most_common(lf, 'word', 20))
+
+# =====================================================
+# EMOJI
+# =====================================================
+
+def emoji_helper(selected_user, df, approximate=False):
+    lf = (
+        _frame(selected_user, df)
+        .select(pl.col('message').str.extract_all(_EMOJI_CLASS).alias('emoji'))
+        .explode('emoji')
+        .filter(pl.col('emoji').is_not_null())
+    )
+    return pd.DataFrame(_most_common(lf, 'emoji'))
+
+# =====================================================
+# TIMELINES
+# =====================================================
+
+def monthly_timeline(selected_user, df):
+    timeline = (
+        _frame(selected_user, df)
+        .group_by(['year', 'month_num', 'month'])
+        .agg(pl.col('message').count())
+        .sort(['year', 'month_num', 'month'])
+        .collect()
+        .to_pandas()
+    )
+    timeline['time'] = timeline['month'] + "-" + timeline['year'].astype(str)
+    return timeline
+
+
+def daily_timeline(selected_user, df):
+    daily = (
+        _frame(selected_user, df)
+        .group_by(pl.col('datetime').dt.date().alias('only_date'))
+        .agg(pl.col('message').count())
+        .sort('only_date')
+        .collect()
+    )
+    return pd.DataFrame({
+        'only_date': daily['only_date'].to_list(),
+        'message': daily['message'].to_list(),
+    })
+
+
+def week_activity_map(selected_user, df):
+    return _value_counts(_frame(selected_user, df), 'day_name')
+
+
+def month_activity_map(selected_user, df):
+    return _value_counts(_frame(selected_user, df), 'month')
+
+
+def activity_heatmap(selected_user, df):
+    counts = (
+        _frame(selected_user, df)
+        .group_by(['day_name', 'period'])
+        .agg(pl.col('message').count())
+        .collect()
+        .to_pandas()
+    )
+    return (
+        counts.pivot(index='day_name', columns='period', values='message')
+        .sort_index()
+        .sort_index(axis=1)
+        .fillna(0)
+    )
+
+# =====================================================
+# SENTIMENT
+# =====================================================
+
+def most_common_messages_by_sentiment(selected_user, df, sentiment, top_n=10,
+                                      approximate=False):
+    if 'sentiment' not in df.columns:
+        return pd.DataFrame()
+
+    lf = _frame(selected_user, df).filter(
+        (pl.col('sentiment') == sentiment) &
+        (pl.col('message') != '<Media omitted>')
+    )
+    return pd.DataFrame(
+        _most_common(lf, 'message', top_n),
+        columns=['message', 'count']
+    )
+
+
+def sentiment_stats(selected_user, df):
+    if 'sentiment' not in df.columns:
+        return pd.Series(dtype=int)
+
+    return _value_counts(_frame(selected_user, df), 'sentiment')
+
+# =====================================================
+# MEDIA
+# =====================================================
+
+def media_stats(selected_user, df):
+    return _value_counts(_frame(selected_user, df), 'media_type')
+
+
+def most_media_shared_users(df):
+    lf = to_polars(df).lazy().filter(pl.col('media_type') != 'Text')
+    counts = _value_counts(lf, 'user')
+    if counts.empty:
+        return pd.Series(dtype=int)
+    return counts.head(10)
+
+# =====================================================
+# RESPONSE TIME
+# =====================================================
+
+def _replies(df):
+    """
+    (user, minutes) for every reply, filtered like helper._response_gaps.
+    """
+    user = pl.col('user')
+    prev_user = user.shift(1)
+
+    return (
+        to_polars(df).lazy()
+        .sort('datetime', maintain_order=True)
+        .with_columns(
+            (pl.col('datetime').diff().dt.total_microseconds() / 60e6)
+            .alias('minutes')
+        )
+        .filter(
+            (user != prev_user) &
+            (user != 'group_notification') &
+            (prev_user != 'group_notification') &
+            (pl.col('minutes') > 0) &
+            (pl.col('minutes') <= 1440)
+        )
+        .select('user', 'minutes')
+    )
+
+
+def response_time_analysis(df):
+    replies = (
+        _replies(df)
+        .group_by('user', maintain_order=True)
+        .agg(
+            pl.col('minutes').sum().alias('total'),
+            pl.len().alias('n')
+        )
+        .filter(pl.col('n') >= 3)
+        .collect()
+    )
+
+    return {
+        u: round(total / n, 2)
+        for u, total, n in replies.iter_rows()
+    }
+
+
+def response_time_quantiles(df, quantiles=(0.5, 0.9), approximate=False):
+    n = pl.len()
+
+    def inverted_cdf(q):
+        # Smallest sample with at least a q share of samples at or below it
+        rank = ((n * q).ceil().cast(pl.Int64) - 1).clip(lower_bound=0)
+        return pl.col('minutes').sort().get(rank).alias(f'q{q}')
+
+    replies = (
+        _replies(df)
+        .group_by('user', maintain_order=True)
+        .agg(n.alias('n'), *[inverted_cdf(q) for q in quantiles])
+        .filter(pl.col('n') >= 3)
+        .collect()
+    )
+
+    return {
+        u: {q: round(value, 2) for q, value in zip(quantiles, values)}
+        for u, _, *values in replies.iter_rows()
+    }
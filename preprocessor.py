@@ -1,4 +1,5 @@
 import re
+import numpy as np
 import pandas as pd
 
 
@@ -63,6 +64,9 @@ def preprocess(data: str) -> pd.DataFrame:
     # Drop invalid rows (very rare but safe)
     df.dropna(subset=['datetime'], inplace=True)
 
+    # Keep rows in time order so date ranges are contiguous slices
+    df = df.sort_values('datetime', kind='stable').reset_index(drop=True)
+
     # ---------- Date features ----------
     df['only_date'] = df['datetime'].dt.date
     df['year'] = df['datetime'].dt.year
@@ -99,3 +103,24 @@ def preprocess(data: str) -> pd.DataFrame:
     df['media_type'] = df['message'].apply(detect_media_type)
 
     return df
+
+
+def build_day_index(df: pd.DataFrame):
+    """
+    Per-day row offsets into a datetime-sorted frame: the rows of
+    days[i] are df.iloc[offsets[i]:offsets[i + 1]].
+    """
+    d = df['datetime'].to_numpy().astype('datetime64[D]')
+    starts = np.flatnonzero(np.r_[True, d[1:] != d[:-1]]) if len(d) else np.array([], dtype=int)
+    return d[starts], np.append(starts, len(d))
+
+
+def date_bounds(day_index, start, end):
+    """
+    Row offsets (lo, hi) of the days start..end (inclusive), found by
+    binary search on the day index.
+    """
+    days, offsets = day_index
+    lo = offsets[np.searchsorted(days, np.datetime64(start, 'D'), 'left')]
+    hi = offsets[np.searchsorted(days, np.datetime64(end, 'D'), 'right')]
+    return int(lo), int(hi)
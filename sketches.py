@@ -0,0 +1,177 @@
+import heapq
+import random
+
+# =====================================================
+# BOUNDED-MEMORY SKETCHES (APPROXIMATE MODE)
+# =====================================================
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch.
+
+    Tracks at most `capacity` items. Every reported count overestimates
+    the true count by at most `error_bound`, which is 0 until the first
+    eviction and never exceeds total / capacity, so any item seen more
+    often than total / capacity is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity=2000):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []  # (count, item), lazily refreshed
+
+    def update(self, item, weight=1):
+        self.total += weight
+
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+            return
+
+        # Evict the current minimum; heap entries may be stale
+        while True:
+            count, victim = heapq.heappop(self._heap)
+            if self.counts[victim] == count:
+                break
+            heapq.heappush(self._heap, (self.counts[victim], victim))
+
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[item] = count + weight
+        self.errors[item] = count
+        heapq.heappush(self._heap, (count + weight, item))
+
+    def extend(self, items):
+        for item in items:
+            self.update(item)
+
+    @property
+    def error_bound(self):
+        if len(self.counts) < self.capacity:
+            return 0
+        return max(self.errors.values())
+
+    def most_common(self, n=None):
+        items = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return items if n is None else items[:n]
+
+    def guaranteed(self, item):
+        """
+        Lower bound on the true count of `item`.
+        """
+        return self.counts.get(item, 0) - self.errors.get(item, 0)
+
+    def guaranteed_top(self, n):
+        """
+        The top `n` entries whose place is certain: an entry is kept only
+        if its guaranteed count reaches the estimated count of the first
+        entry outside the top `n`.
+        """
+        items = self.most_common()
+        cutoff = items[n][1] if n < len(items) else 0
+        return [
+            (item, count) for item, count in items[:n]
+            if self.guaranteed(item) >= cutoff
+        ]
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of at most `size` items from a stream
+    (Algorithm R).
+    """
+
+    def __init__(self, size=20000, seed=0):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self._rng = random.Random(seed)
+
+    def update(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+
+        j = self._rng.randrange(self.seen)
+        if j < self.size:
+            self.items[j] = item
+
+    def extend(self, items):
+        for item in items:
+            self.update(item)
+
+
+class QuantileSketch:
+    """
+    KLL-style streaming quantile sketch.
+
+    Keeps a stack of compactors whose combined size stays around
+    `3 * k` values. Rank error is roughly `rank_error * n`.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+
+    @property
+    def rank_error(self):
+        return 2.0 / self.k
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(self.k * (2 / 3) ** depth))
+
+    def _size(self):
+        return sum(len(level) for level in self.levels)
+
+    def update(self, value):
+        self.n += 1
+        self.levels[0].append(value)
+        if self._size() >= sum(self._capacity(h) for h in range(len(self.levels))):
+            self._compress()
+
+    def extend(self, values):
+        for value in values:
+            self.update(value)
+
+    def _compress(self):
+        for h, level in enumerate(self.levels):
+            if len(level) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+
+                level.sort()
+                # An odd leftover stays behind so no weight is lost
+                keep = [level.pop()] if len(level) % 2 else []
+                offset = self._rng.randint(0, 1)
+                self.levels[h + 1].extend(level[offset::2])
+                self.levels[h] = keep
+                return
+
+    def quantile(self, q):
+        weighted = sorted(
+            (value, 2 ** h)
+            for h, level in enumerate(self.levels)
+            for value in level
+        )
+        if not weighted:
+            return None
+
+        target = q * sum(w for _, w in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]